@@ -1,102 +1,1083 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
+import base64
+import http.client
 import json
+import logging
+import os
+import random
 import re
+import socket
+import sqlite3
+import ssl
+import sys
+import threading
 import time
-import urllib.request
+import urllib.error
 import urllib.parse
+import urllib.request
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
-def fetch_json(url, timeout=30):
-    """带超时保护的请求函数"""
-    req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0 (OpenClaw-Crawler)'})
-    with urllib.request.urlopen(req, timeout=timeout) as response:
-        return json.loads(response.read().decode("utf-8"))
+try:
+    import orjson
+except ImportError:  # orjson 为可选加速依赖，未安装时退回标准库 json
+    orjson = None
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--output-dir", required=True)
-    parser.add_argument("--category-cd", default="013")
-    parser.add_argument("--limit", type=int, default=None, help="最多下载多少部法令后停止")
-    args = parser.parse_args()
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只协商 gzip
+    brotli = None
+
+DEFAULT_BASE_URL = "https://laws.e-gov.go.jp/api/2"
+
+# 法令全文 JSON 重复结构多、压缩率高，显式声明可接受压缩以减少传输量
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (OpenClaw-Crawler)',
+    'Accept': 'application/json',
+    'Accept-Encoding': 'br, gzip' if brotli is not None else 'gzip',
+}
+
+# 临时性失败 (限流/服务端错误/网络异常) 的重试与退避参数 (秒)
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+MAX_RETRIES = 5
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+# 跟随重定向 (Location) 的最大次数，超过后按永久性错误处理
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = frozenset((301, 302, 303, 307, 308))
+
+# 索引页每轮并行预取的最大页数
+MAX_PAGE_BATCH = 16
+
+# DNS 解析结果缓存时间 (秒)
+DNS_CACHE_TTL = 300
+
+# 已下载、等待后台写盘的全文数量上限 (限制内存占用)
+MAX_PENDING_WRITES = 16
+
+# 待处理法令队列的容量 (约两页索引)
+QUEUE_SIZE = 200
+
+# 每处理多少条索引输出一次进度
+PROGRESS_EVERY = 50
+
+# 读取响应体时的分块大小 (也是 socket 读缓冲区的大小)
+READ_CHUNK_SIZE = 64 * 1024
+
+# 进程内按 URL 缓存的索引/探测响应条数上限 (保存原始字节，LRU 淘汰)
+MEMO_SIZE = 4096
+
+# 日志积攒多少行后一次性写出 (警告及以上级别立即写出)
+LOG_BATCH_LINES = 50
+
+logger = logging.getLogger("download_laws")
+
+class BatchedStreamHandler(logging.StreamHandler):
+    """缓冲日志行，攒够 capacity 行或遇到 flush_level 以上级别时一次写出，避免每条法令一次系统调用"""
+
+    def __init__(self, stream=None, capacity=LOG_BATCH_LINES, flush_level=logging.WARNING):
+        super().__init__(stream)
+        self.capacity = capacity
+        self.flush_level = flush_level
+        self._lines = []
+
+    def emit(self, record):
+        try:
+            self._lines.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self._lines) >= self.capacity or record.levelno >= self.flush_level:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if self._lines:
+                self.stream.write("\n".join(self._lines) + "\n")
+                self._lines.clear()
+            self.stream.flush()
+
+def setup_logging():
+    """命令行入口使用: 日志输出到 stdout，按批写出"""
+    logger.addHandler(BatchedStreamHandler(sys.stdout))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+def flush_log():
+    """立即写出缓冲中的日志 (翻页、进度等节点调用)"""
+    for handler in logger.handlers:
+        handler.flush()
+
+# 文件名中不允许出现的字符 (模块级预编译，避免每部法令重复解析)
+_UNSAFE_CHARS_RE = re.compile(r"[^\w\-]")
+
+class _SafeCharTable(dict):
+    """str.translate 用的惰性映射表: 每个码位只用正则判断一次，之后直接查表"""
+
+    def __missing__(self, codepoint):
+        value = self[codepoint] = 0x5F if _UNSAFE_CHARS_RE.match(chr(codepoint)) else codepoint
+        return value
+
+_SAFE_CHAR_TABLE = _SafeCharTable()
+
+def sanitize_filename(value, max_len=50):
+    """将法令名转换为安全的文件名片段"""
+    if not value:
+        return "unknown"
+    # 逐字符一对一替换，先截断再转换结果不变
+    return value[:max_len].translate(_SAFE_CHAR_TABLE)
+
+def loads_json(data):
+    """直接解析响应字节，不经过中间的 str 解码"""
+    if orjson is not None:
+        return orjson.loads(data)
+    # 标准库同样接受 bytes/bytearray 并自动识别 UTF-8
+    return json.loads(data)
+
+def dumps_json(obj):
+    """序列化为带 2 空格缩进的 UTF-8 字节"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+def dumps_json_line(obj):
+    """序列化为紧凑的单行 JSON (含换行符)，用于 .jsonl 旁路文件"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+    return (json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+def save_json(file_path, payload):
+    """同步落盘，在写盘线程池中执行；内容与已有文件一致时跳过写入，返回是否写入"""
+    return save_bytes(file_path, dumps_json(payload))
+
+def save_bytes(file_path, data):
+    """原子写入字节内容；内容与已有文件一致时跳过写入，返回是否写入"""
+    try:
+        if file_path.stat().st_size == len(data) and file_path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    # 先写同目录临时文件再原子替换，中断时不会留下半截文件冒充已下载
+    tmp_path = file_path.with_suffix(file_path.suffix + ".tmp")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return True
 
-    output_dir = Path(args.output_dir)
-    output_dir.mkdir(parents=True, exist_ok=True)
+class HttpCache:
+    """基于 sqlite 的持久化响应缓存，配合 ETag/Last-Modified 做条件请求"""
 
-    offset = 1
-    limit_per_page = 100
-    active_count = 0
-    target_cat = args.category_cd.zfill(3)
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB)"
+        )
 
-    print(f"🚀 启动流式下载任务。目标分类: {target_cat}", flush=True)
+    def get(self, url):
+        """返回 (etag, last_modified, body) 或 None"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT etag, last_modified, body FROM responses WHERE url = ?", (url,)
+            ).fetchone()
 
+    def put(self, url, etag, last_modified, body):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (url, etag, last_modified, None if body is None else bytes(body)),
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class BufferedHTTPResponse(http.client.HTTPResponse):
+    """socket 读缓冲区从默认的 8 KiB 放大到 READ_CHUNK_SIZE，减少读取大型全文时的 recv 次数"""
+
+    tls_session = None
+
+    def __init__(self, sock, *args, **kwargs):
+        super().__init__(sock, *args, **kwargs)
+        self.fp.close()
+        self.fp = sock.makefile("rb", buffering=READ_CHUNK_SIZE)
+        self._sock = sock
+
+    def begin(self):
+        super().begin()
+        # TLS 1.3 的会话票据在握手后才到达，读完响应头时已可取得；
+        # 需在此记录，因为 Connection: close 的响应读完后 socket 即被关闭
+        if isinstance(self._sock, ssl.SSLSocket):
+            self.tls_session = self._sock.session
+
+class ResumableHTTPSConnection(http.client.HTTPSConnection):
+    """握手时带上同一主机之前的 TLS 会话，服务器支持时可省去完整握手"""
+
+    tls_session = None
+
+    def connect(self):
+        http.client.HTTPConnection.connect(self)
+        server_hostname = self._tunnel_host or self.host
+        self.sock = self._context.wrap_socket(
+            self.sock, server_hostname=server_hostname, session=self.tls_session
+        )
+
+class ConnectionPool:
+    """按 (scheme, host) 复用 keep-alive 连接，避免每次请求重新进行 TCP+TLS 握手"""
+
+    def __init__(self, timeout=30, maxsize=10):
+        self.timeout = timeout
+        # 每个主机最多保留的空闲连接数
+        self.maxsize = maxsize
+        self._idle = {}
+        # (host, port) -> (过期时间, 地址列表)
+        self._dns = {}
+        # TLS 会话只能在创建它的 context 中恢复，所有连接共用一个 context
+        self._ssl_context = ssl.create_default_context()
+        self._ssl_context.set_alpn_protocols(["http/1.1"])
+        # netloc -> 最近一次握手得到的 TLS 会话
+        self._tls_sessions = {}
+        # 与 urllib 一致，读取环境变量中的 HTTP(S)_PROXY / NO_PROXY
+        self._proxies = urllib.request.getproxies()
+        self._lock = threading.Lock()
+
+    def _proxy_for(self, scheme, netloc):
+        """返回 (代理地址 host:port, 代理认证头)；不经代理时返回 None"""
+        proxy = self._proxies.get(scheme)
+        if not proxy or urllib.request.proxy_bypass(urllib.parse.urlsplit(f"//{netloc}").hostname or netloc):
+            return None
+        if "://" not in proxy:
+            proxy = f"http://{proxy}"
+        parts = urllib.parse.urlsplit(proxy)
+        address = parts.hostname if parts.port is None else f"{parts.hostname}:{parts.port}"
+        headers = {}
+        if parts.username is not None:
+            credentials = f"{urllib.parse.unquote(parts.username)}:{urllib.parse.unquote(parts.password or '')}"
+            headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode()).decode("ascii")
+        return address, headers
+
+    def acquire(self, scheme, netloc):
+        """返回 (连接, 是否为复用的旧连接)
+
+        经 HTTP 代理转发的明文连接带有 proxy_headers，请求行需使用完整 URL；HTTPS 通过 CONNECT 隧道。
+        """
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop(), True
+            tls_session = self._tls_sessions.get(netloc)
+        proxy = self._proxy_for(scheme, netloc)
+        if scheme == "https":
+            conn = ResumableHTTPSConnection(
+                netloc if proxy is None else proxy[0], timeout=self.timeout, context=self._ssl_context
+            )
+            if proxy is not None:
+                conn.set_tunnel(netloc, headers=proxy[1])
+            conn.tls_session = tls_session
+            conn.proxy_headers = None
+        else:
+            conn = http.client.HTTPConnection(netloc if proxy is None else proxy[0], timeout=self.timeout)
+            conn.proxy_headers = None if proxy is None else proxy[1]
+        conn.response_class = BufferedHTTPResponse
+        # 新建连接时使用缓存的解析结果；TLS 的 SNI 与证书校验仍基于原主机名
+        conn._create_connection = self._create_connection
+        return conn, False
+
+    def _resolve(self, host, port):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._dns.get((host, port))
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        addresses = [info[4][:2] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)]
+        with self._lock:
+            self._dns[(host, port)] = (now + DNS_CACHE_TTL, addresses)
+        return addresses
+
+    def _create_connection(self, address, timeout, source_address=None):
+        """与 socket.create_connection 相同，但跳过重复的 DNS 查询"""
+        host, port = address
+        error = None
+        for ip_address in self._resolve(host, port):
+            try:
+                return socket.create_connection(ip_address, timeout, source_address)
+            except OSError as e:
+                error = e
+        # 缓存的地址全部不可用时作废，下次重新解析
+        with self._lock:
+            self._dns.pop((host, port), None)
+        raise error
+
+    def _remember_session(self, netloc, session):
+        if session is not None:
+            self._tls_sessions[netloc] = session
+
+    def release(self, scheme, netloc, conn, tls_session=None):
+        with self._lock:
+            self._remember_session(netloc, tls_session)
+            idle = self._idle.setdefault((scheme, netloc), [])
+            if len(idle) < self.maxsize:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def discard(self, scheme, netloc, conn, tls_session=None):
+        """关闭服务器不再保持的连接 (Connection: close)，但保留其 TLS 会话供重连时恢复"""
+        with self._lock:
+            self._remember_session(netloc, tls_session)
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle.clear()
+
+def read_body(response):
+    """分块读入预分配的缓冲区，大型法令详情避免整包拼接带来的额外拷贝"""
+    length = response.length
+    if length is None:
+        # chunked 编码: 长度未知，逐块追加
+        buf = bytearray()
+        while chunk := response.read(READ_CHUNK_SIZE):
+            buf += chunk
+        return buf
+    buf = bytearray(length)
+    view = memoryview(buf)
+    pos = 0
+    while pos < length:
+        n = response.readinto(view[pos:pos + READ_CHUNK_SIZE])
+        if not n:
+            raise http.client.IncompleteRead(bytes(view[:pos]), length - pos)
+        pos += n
+    if not response.isclosed():
+        # 空响应体 (如 304) 不会触发 readinto，需读到结尾以释放连接供复用
+        response.read()
+    return buf
+
+def decode_body(body, encoding):
+    """按 Content-Encoding 解压响应体"""
+    encoding = (encoding or "").strip().lower()
+    if not encoding or encoding == "identity":
+        return body
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompress(body, zlib.MAX_WBITS | 16)
+    if encoding == "deflate":
+        return zlib.decompress(body)
+    if encoding == "br" and brotli is not None:
+        return brotli.decompress(bytes(body))
+    raise ValueError(f"unsupported Content-Encoding: {encoding}")
+
+def send_request(url, pool, headers):
+    """通过连接池发送一次 GET，返回 (响应, 未解压的响应体)；不处理重定向"""
+    parts = urllib.parse.urlsplit(url)
+    path = f"{parts.path}?{parts.query}" if parts.query else parts.path
     while True:
-        # 阶段 1: 获取一页索引 (100条)
-        list_url = f"https://laws.e-gov.go.jp/api/2/laws?response_format=json&offset={offset}&limit={limit_per_page}"
+        conn, reused = pool.acquire(parts.scheme, parts.netloc)
+        target, request_headers = path, headers
+        if conn.proxy_headers is not None:
+            # 经 HTTP 代理转发时请求行为完整 URL
+            target = urllib.parse.urlunsplit(parts._replace(fragment=""))
+            request_headers = {**headers, **conn.proxy_headers}
         try:
-            print(f"📡 正在扫描索引偏移量: {offset}...", flush=True)
-            data = fetch_json(list_url)
-            laws = data.get("laws_response", {}).get("law_info_list", [])
-            
-            if not laws:
-                print("🏁 已到达索引末尾。")
-                break
-
-            # 阶段 2: 立即处理这一页中的每一条法律 (流式处理)
-            for law in laws:
-                # 检查是否达到用户设定的 limit
-                if args.limit and active_count >= args.limit:
-                    print(f"🛑 已达到设定的下载上限 ({args.limit})，停止任务。")
-                    return
+            conn.request("GET", target, headers=request_headers)
+            response = conn.getresponse()
+            body = read_body(response)
+        except ConnectionError:
+            conn.close()
+            # 复用的空闲连接可能已被服务器关闭，换新连接重试
+            if reused:
+                continue
+            raise
+        except BaseException:
+            conn.close()
+            raise
+        if response.will_close:
+            pool.discard(parts.scheme, parts.netloc, conn, response.tls_session)
+        else:
+            pool.release(parts.scheme, parts.netloc, conn, response.tls_session)
+        return response, body
+
+def fetch_bytes(url, pool, cache=None, revalidate=None, parse=None):
+    """带超时保护的请求函数 (通过连接池复用长连接)，返回原始响应体；传入 cache 时使用条件请求
+
+    重定向最多跟随 MAX_REDIRECTS 次，缓存仍以原始 URL 为键。
+    传入 parse 时返回 (响应体, 解析结果)，且只有解析成功的响应体才写入缓存。
+    revalidate 不为 None 时用于全文: 返回 (响应体, ETag, Last-Modified)，缓存中只保存校验信息，
+    且由调用方在文件写入成功后再记录，避免写盘失败时留下与旧文件不符的校验信息；
+    仅当 revalidate 为 True 时才发送条件请求，服务器返回 304 时响应体为 None，表示内容未变化。
+    """
+    headers = HEADERS
+    cached = cache.get(url) if cache is not None else None
+    if cached is not None and cached[2] is None and not revalidate:
+        # 只有校验信息而没有响应体的记录无法还原内容，本地也没有副本时不能发条件请求
+        cached = None
+    if cached is not None:
+        etag, last_modified, _ = cached
+        headers = dict(HEADERS)
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    target = url
+    for _ in range(MAX_REDIRECTS + 1):
+        response, body = send_request(target, pool, headers)
+        location = response.getheader("Location")
+        if response.status not in REDIRECT_STATUSES or not location:
+            break
+        target = urllib.parse.urljoin(target, location)
+    else:
+        raise urllib.error.HTTPError(
+            url, response.status, f"重定向超过 {MAX_REDIRECTS} 次 (最后指向 {target})", response.headers, None
+        )
+    if response.status == 304 and cached is not None:
+        if revalidate is not None:
+            return None, None, None
+        # 服务器确认未变化，直接使用缓存内容
+        body = cached[2]
+        return body if parse is None else (body, parse(body))
+    if response.status >= 300:
+        raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+    body = decode_body(body, response.getheader("Content-Encoding"))
+    etag = response.getheader("ETag")
+    last_modified = response.getheader("Last-Modified")
+    if revalidate is not None:
+        return body, etag, last_modified
+    # 先解析: 损坏的响应体抛出异常，不会被缓存后经 304 反复复用
+    data = None if parse is None else parse(body)
+    # 没有校验信息的响应无法安全复用，不写入缓存
+    if cache is not None and (etag or last_modified):
+        cache.put(url, etag, last_modified, body)
+    return body if parse is None else (body, data)
+
+def fetch_json(url, pool, cache=None, revalidate=None):
+    if revalidate is None:
+        return loads_json(fetch_bytes(url, pool, cache))
+    body, etag, last_modified = fetch_bytes(url, pool, cache, revalidate)
+    return (None if body is None else loads_json(body)), etag, last_modified
+
+def fetch_parsed(url, pool, cache=None, revalidate=None):
+    """索引页与 revision_info 用: 在请求线程中解析，返回 (原始响应体, 解析结果)"""
+    return fetch_bytes(url, pool, cache, revalidate, parse=loads_json)
+
+def is_transient_error(exc):
+    """限流、5xx、网络层异常与无法解析的响应体 (传输中损坏) 值得重试；404 等其他 HTTP 错误是永久性的"""
+    if isinstance(exc, urllib.error.HTTPError):
+        return exc.code in RETRY_STATUSES
+    # orjson.JSONDecodeError 是 json.JSONDecodeError 的子类
+    return isinstance(exc, (OSError, http.client.HTTPException, json.JSONDecodeError, UnicodeDecodeError))
+
+class RateLimiter:
+    """令牌桶限速器: 全局平均每秒最多 rate 个请求，空闲积攒的令牌允许最多 burst 个请求突发"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return self
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+    async def __aexit__(self, *exc):
+        return False
+
+class ApiClient:
+    """整个任务共享的客户端: 连接池 + 并发信号量 + 令牌桶"""
+
+    def __init__(self, max_concurrent, rate_per_sec, burst=1, timeout=30, cache=None):
+        self.pool = ConnectionPool(timeout, maxsize=max_concurrent)
+        # 阻塞请求使用专属线程池: 默认线程池只有 min(32, CPU 数 + 4) 个线程，会暗中压低并发上限
+        self.http_executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="http")
+        self.sem = asyncio.Semaphore(max_concurrent)
+        self.limiter = RateLimiter(rate_per_sec, burst)
+        self.cache = cache
+        self.memo = OrderedDict()
+
+    async def get_json(self, url, cacheable=False, revalidate=None):
+        """请求并解析 JSON (解析在请求线程中完成，不占用事件循环)；cacheable 的 URL 在一次任务内只请求一次"""
+        if not cacheable:
+            return await self._request(fetch_json, url, cacheable, revalidate)
+        body = self.memo.get(url)
+        if body is not None:
+            # 进程内只缓存原始字节，解析后的对象体积大得多，命中时按需解码；
+            # 索引页与 revision_info 体积小，直接在事件循环中解析
+            self.memo.move_to_end(url)
+            return loads_json(body)
+        # 在重试范围内解析，损坏的响应体按临时性错误重试，且不会进入 memo
+        body, data = await self._request(fetch_parsed, url, cacheable, revalidate)
+        self.memo[url] = body
+        if len(self.memo) > MEMO_SIZE:
+            self.memo.popitem(last=False)
+        return data
+
+    async def get_bytes(self, url, revalidate=None):
+        """请求并返回未解析的原始响应体 (用于 --raw-output 的全文)"""
+        return await self._request(fetch_bytes, url, False, revalidate)
 
-                law_id = law.get("law_id")
-                law_name = law.get("law_name")
+    async def _request(self, fetch, url, cacheable, revalidate):
+        """在线程中执行阻塞请求；临时性失败时指数退避重试
 
+        cacheable 的请求走磁盘缓存；revalidate 不为 None 的请求只读取校验信息 (见 fetch_bytes)。
+        """
+        cache = self.cache if cacheable or revalidate is not None else None
+        for attempt in range(MAX_RETRIES + 1):
+            retry_after = ""
+            async with self.sem, self.limiter:
                 try:
-                    # 下载详情进行精准过滤
-                    detail_url = f"https://laws.e-gov.go.jp/api/2/law_data/{law_id}?response_format=json&law_full_text_format=json&extraction_target=all"
-                    detail_payload = fetch_json(detail_url)
-                    
-                    data_root = detail_payload.get("law_data_response", {})
-                    revision_info = data_root.get("revision_info", {})
-                    
-                    # 校验分类: 必须是 013 (国税)
-                    current_cat = str(revision_info.get("category_cd", "")).zfill(3)
-                    if current_cat != target_cat:
-                        continue
+                    return await asyncio.get_running_loop().run_in_executor(
+                        self.http_executor, fetch, url, self.pool, cache, revalidate
+                    )
+                except Exception as e:
+                    if not is_transient_error(e) or attempt == MAX_RETRIES:
+                        raise
+                    if isinstance(e, urllib.error.HTTPError):
+                        retry_after = e.headers.get("Retry-After", "")
+            # 退避期间释放并发名额; full jitter 避免多个请求同时重试
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+            if retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            await asyncio.sleep(delay)
+
+    def close(self):
+        # 被取消的预取请求可能仍在线程中等待超时，不阻塞退出
+        self.http_executor.shutdown(wait=False, cancel_futures=True)
+        self.pool.close()
+        if self.cache is not None:
+            self.cache.close()
+
+def build_url(base_url, path, **params):
+    """拼接 API 地址 (用于参数会变化的索引翻页)"""
+    return f"{base_url.rstrip('/')}/{path.lstrip('/')}?{urllib.parse.urlencode(params)}"
+
+def detail_query(extraction_target):
+    """law_data 全文请求的查询串；参数在一次任务内不变，只需编码一次"""
+    return "?" + urllib.parse.urlencode(
+        {"response_format": "json", "law_full_text_format": "json", "extraction_target": extraction_target}
+    )
+
+# revision_info 探测的查询参数固定不变，模块加载时编码一次
+_PROBE_QUERY = "?" + urllib.parse.urlencode({"response_format": "json", "extraction_target": "revision_info"})
+
+# 视为非现行法令的 repeal_status
+_REPEALED_STATUSES = frozenset(("Repeal", "Expire", "LossOfEffectiveness"))
+
+def parse_category(value):
+    """分类代码统一为整数比较 ("013"、"13"、13 均为 13)，无法解析时返回 None"""
+    if isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def payload_revision_info(payload):
+    """取出 law_data 响应中的 revision_info"""
+    return payload.get("law_data_response", {}).get("revision_info", {})
+
+def listing_category_info(law):
+    """索引条目中承载分类信息的字典 (嵌套的 revision_info 或条目本身)"""
+    revision_info = law.get("revision_info")
+    return revision_info if isinstance(revision_info, dict) else law
+
+def listing_revision_info(law):
+    """索引条目同时带有分类与废止状态时直接使用，否则返回 None (需要探测)
+
+    只有分类而缺少 repeal_status 时不能据此判断为现行法令，
+    尤其是 --raw-output 不再用全文复查。
+    """
+    revision_info = listing_category_info(law)
+    if "category_cd" in revision_info and "repeal_status" in revision_info:
+        return revision_info
+    return None
+
+@dataclass
+class Config:
+    """一次下载任务的全部参数"""
+    output_dir: Path
+    base_url: str = DEFAULT_BASE_URL
+    category_cd: str = "013"
+    limit: Optional[int] = None
+    max_concurrent: int = 10
+    rate_per_sec: float = 5.0
+    burst: int = 10
+    page_size: int = 100
+    use_cache: bool = True
+    refresh: bool = False
+    extraction_target: str = "all"
+    raw_output: bool = False
+
+def scan_done_ids(output_dir):
+    """收集输出目录中已有法令文件的 law_id
+
+    直接用 os.scandir 逐项读取文件名，不为每个文件创建 Path 对象，也不做 stat。
+    """
+    with os.scandir(output_dir) as entries:
+        return {entry.name.split("_", 1)[0] for entry in entries if entry.name.endswith(".json")}
+
+class Downloader:
+    """流式下载管线: 客户端、写盘线程池和缓存在整个任务中只构造一次"""
+
+    def __init__(self, config):
+        self.config = config
+        self.base_url = config.base_url.rstrip("/")
+        self.detail_query = detail_query(config.extraction_target)
+        self.output_dir = Path(config.output_dir)
+        self.target_cat = config.category_cd.zfill(3)
+        self.target_cat_code = parse_category(config.category_cd)
+        # 索引接口是否接受 category_cd 参数；被拒绝时退回客户端过滤
+        self.server_filter = True
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # 索引页与 revision_info 探测结果持久化缓存，重跑时只需条件请求
+        cache = HttpCache(self.output_dir / ".httpcache.sqlite") if config.use_cache else None
+        self.client = ApiClient(config.max_concurrent, config.rate_per_sec, config.burst, cache=cache)
+        # 序列化与写盘放到独立线程池，避免阻塞事件循环中的并发下载
+        self.write_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="writer")
+        self.write_slots = asyncio.Semaphore(MAX_PENDING_WRITES)
+        # 已提交但尚未完成的写盘任务，结束前统一等待
+        self.pending_writes = set()
+        # 追加式清单，每写入一个文件记一行；大缓冲区合并为少量系统调用
+        self.manifest = (self.output_dir / "index.jsonl").open("ab", buffering=1 << 20)
+        # law_id -> (revision_info, 实际可用的标识)，避免重复探测
+        self.revision_cache = {}
+        # 已下载的 law_id (文件名前缀)，启动时扫描一次，之后 O(1) 判断
+        self.done_ids = scan_done_ids(self.output_dir)
+        # active_count: 已占用的名额 (含下载中)；saved_count: 已确认保存 (或已存在/未变化) 的法令数
+        self.active_count = 0
+        self.saved_count = 0
+        # 确认保存数达到 limit 时置位，生产者据此停止投递
+        self.limit_event = asyncio.Event()
+        # 有名额被释放或达到上限时置位，唤醒等待名额的 worker
+        self.slot_freed = asyncio.Event()
+        if config.limit is not None and config.limit <= 0:
+            # 上限为 0 (或负数) 时无需下载任何法令
+            self.limit_event.set()
+        self.failed_count = 0
+        self.failed_pages = 0
+        self.processed_count = 0
+        self.started_at = time.monotonic()
+        # 本次运行中最终失败的法令与索引页，每行一条 JSON，便于单独重跑
+        self.failed_path = self.output_dir / "failed.jsonl"
+
+    def close(self):
+        self.client.close()
+        self.write_executor.shutdown(wait=True)
+        self.manifest.close()
+
+    def limit_reached(self):
+        """已确认保存的法令数是否达到 limit"""
+        return self.limit_event.is_set()
+
+    async def claim_slot(self):
+        """在下载全文前占用一个名额
+
+        名额已被下载中的法令占满时等待: 其中有失败的会释放名额，由后续法令补上。
+        确认保存数达到 limit 后返回 False。
+        """
+        limit = self.config.limit
+        while True:
+            if self.limit_event.is_set() or (limit is not None and limit <= 0):
+                return False
+            if limit is None or self.active_count < limit:
+                self.active_count += 1
+                return True
+            self.slot_freed.clear()
+            await self.slot_freed.wait()
+
+    def release_slot(self):
+        """下载或保存失败、或全文复查未通过时归还名额"""
+        self.active_count -= 1
+        self.slot_freed.set()
+
+    def confirm_saved(self):
+        """记录一部确认完成的法令，返回其序号"""
+        self.saved_count += 1
+        if self.config.limit and self.saved_count >= self.config.limit:
+            self.limit_event.set()
+            self.slot_freed.set()
+        return self.saved_count
+
+    def list_url(self, offset):
+        params = {"response_format": "json", "offset": offset, "limit": self.config.page_size}
+        if self.server_filter:
+            # 让索引接口按分类过滤，绝大多数无关法令无需再探测
+            params["category_cd"] = self.target_cat
+        return build_url(self.base_url, "laws", **params)
+
+    def detail_url(self, law_id):
+        return f"{self.base_url}/law_data/{urllib.parse.quote(law_id, safe='')}{self.detail_query}"
+
+    def probe_url(self, law_id):
+        return f"{self.base_url}/law_data/{urllib.parse.quote(law_id, safe='')}{_PROBE_QUERY}"
+
+    async def fetch_revision_info(self, law_id, law_num=None):
+        """只请求 revision_info，体积远小于全文，用于下载前过滤
+
+        先按 law_id 探测，返回 404 时再按 law_num 探测；绝大多数法令只需一次请求。
+        返回 (revision_info, 实际可用的标识)。
+        """
+        cached = self.revision_cache.get(law_id)
+        if cached is not None:
+            return cached
+        key = law_id
+        try:
+            payload = await self.client.get_json(self.probe_url(key), cacheable=True)
+        except urllib.error.HTTPError as e:
+            if e.code != 404 or not law_num or law_num == law_id:
+                raise
+            key = law_num
+            payload = await self.client.get_json(self.probe_url(key), cacheable=True)
+        result = (payload_revision_info(payload), key)
+        self.revision_cache[law_id] = result
+        return result
+
+    async def fetch_detail(self, key, law_num=None, raw=False, revalidate=False):
+        """下载全文；按 law_id 请求返回 404 时按 law_num 重试
+
+        返回 (全文, 校验信息)；raw 时全文为未解析的字节。revalidate 时对本地已有的文件
+        做条件请求，未变化时全文为 None。校验信息为 (url, ETag, Last-Modified) 或 None，
+        由调用方在文件写入成功后记录。
+        """
+        get = self.client.get_bytes if raw else self.client.get_json
+        url = self.detail_url(key)
+        try:
+            payload, etag, last_modified = await get(url, revalidate=revalidate)
+        except urllib.error.HTTPError as e:
+            if e.code != 404 or not law_num or law_num == key:
+                raise
+            url = self.detail_url(law_num)
+            payload, etag, last_modified = await get(url, revalidate=revalidate)
+        validators = (url, etag, last_modified) if etag or last_modified else None
+        return payload, validators
+
+    def is_target_law(self, revision_info):
+        """分类匹配且为现行法令"""
+        # 校验分类: 必须是 013 (国税)
+        if parse_category(revision_info.get("category_cd")) != self.target_cat_code:
+            return False
+
+        # 校验状态: 必须是现行 (非废止)
+        return revision_info.get("repeal_status") not in _REPEALED_STATUSES
+
+    async def process_law(self, law):
+        # 检查是否已保存够用户设定的 limit
+        if self.limit_reached():
+            return
+
+        law_id = law.get("law_id")
+        law_num = law.get("law_num")
+        law_name = law.get("law_name")
+        file_path = self.output_dir / f"{law_id}_{sanitize_filename(law_name)}.json"
 
-                    # 校验状态: 必须是现行 (非废止)
-                    repeal = revision_info.get("repeal_status")
-                    if repeal in ["Repeal", "Expire", "LossOfEffectiveness"]:
+        # 文件均为原子写入，存在即说明上次已完整下载，断点续传时直接跳过
+        if not self.config.refresh and law_id in self.done_ids:
+            if await self.claim_slot():
+                logger.info(f"   ⏭️ [{self.confirm_saved()}] 已存在，跳过: {law_name}")
+            return
+
+        # 先用最小的数据预筛，只有通过的法令才下载全文
+        key = law_id
+        revision_info = listing_revision_info(law)
+        if revision_info is None:
+            revision_info, key = await self.fetch_revision_info(law_id, law_num)
+        if not self.is_target_law(revision_info):
+            return
+
+        # 名额在下载全文前占用，同时进行的全文下载不会超过 limit，
+        # 避免为注定被丢弃的法令下载大体积全文
+        if not await self.claim_slot():
+            return
+
+        # 本地已有文件时 (--refresh) 用上次记录的 ETag/Last-Modified 做条件请求，未变化的法令只花一个 304
+        revalidate = law_id in self.done_ids
+        try:
+            if self.config.raw_output:
+                # 分类已由索引/探测确认，原样落盘 API 响应字节，省去一次完整解析与重新格式化
+                detail_payload, validators = await self.fetch_detail(key, law_num, raw=True, revalidate=revalidate)
+                saver, data = save_bytes, detail_payload
+            else:
+                detail_payload, validators = await self.fetch_detail(key, law_num, revalidate=revalidate)
+            if detail_payload is None:
+                logger.info(f"   ✅ [{self.confirm_saved()}] 内容未变化: {law_name}")
+                return
+            if not self.config.raw_output:
+                # 以全文中的 revision_info 为准再做一次精准过滤；--extraction-target 未包含
+                # revision_info 时响应中没有这一部分，沿用索引/探测得到的结果。
+                # 未通过时立即返回，全文不会被序列化，也不会在写盘队列中滞留
+                full_info = payload_revision_info(detail_payload) or revision_info
+                if not self.is_target_law(full_info):
+                    self.release_slot()
+                    logger.info(f"   🚫 全文中的分类或状态不符，跳过: {law_name} "
+                                f"(category_cd={full_info.get('category_cd')}, "
+                                f"repeal_status={full_info.get('repeal_status')})")
+                    return
+                saver, data = save_json, detail_payload
+
+            # 待写入的全文数量有上限，写盘跟不上时在此处产生背压
+            await self.write_slots.acquire()
+        except BaseException:
+            self.release_slot()
+            raise
+
+        # 执行保存: 交给后台写盘，当前 worker 立即去处理下一条法令
+        task = asyncio.create_task(self.save_in_background(law, file_path, saver, data, validators))
+        self.pending_writes.add(task)
+        task.add_done_callback(self.pending_writes.discard)
+
+    def save_file(self, file_path, saver, data, validators):
+        """在写盘线程中执行: 写入成功后才记录全文的校验信息，写盘失败时下次 --refresh 仍会重新下载"""
+        written = saver(file_path, data)
+        cache = self.client.cache
+        if validators is not None and cache is not None:
+            url, etag, last_modified = validators
+            cache.put(url, etag, last_modified, None)
+        return written
+
+    async def save_in_background(self, law, file_path, saver, data, validators=None):
+        law_name = law.get("law_name")
+        try:
+            written = await asyncio.get_running_loop().run_in_executor(
+                self.write_executor, self.save_file, file_path, saver, data, validators
+            )
+        except Exception as e:
+            self.release_slot()
+            self.record_failure(law, e)
+            return
+        finally:
+            self.write_slots.release()
+        self.done_ids.add(law.get("law_id"))
+        saved_index = self.confirm_saved()
+
+        if written:
+            self.manifest.write(dumps_json_line(
+                {"law_id": law.get("law_id"), "law_num": law.get("law_num"), "law_name": law_name, "path": file_path.name}
+            ))
+            logger.info(f"   ✅ [{saved_index}] 已保存: {law_name}")
+        else:
+            logger.info(f"   ✅ [{saved_index}] 内容未变化: {law_name}")
+
+    async def fetch_page(self, offset):
+        try:
+            data = await self.client.get_json(self.list_url(offset), cacheable=True)
+        except urllib.error.HTTPError as e:
+            if e.code != 400 or not self.server_filter:
+                raise
+            logger.info("ℹ️ 索引接口不接受 category_cd 参数，改为逐条过滤")
+            self.server_filter = False
+            data = await self.client.get_json(self.list_url(offset), cacheable=True)
+        laws = data.get("laws_response", {}).get("law_info_list", [])
+        if self.server_filter and offset == 1:
+            self.check_server_filter(laws)
+        return laws
+
+    def check_server_filter(self, laws):
+        """抽查首页: 若条目自带分类且不符，说明服务器忽略了参数 (逐条过滤仍会兜底)"""
+        for law in laws:
+            revision_info = listing_category_info(law)
+            if "category_cd" in revision_info and parse_category(revision_info["category_cd"]) != self.target_cat_code:
+                logger.info("ℹ️ 索引接口未按 category_cd 过滤，改为逐条过滤")
+                self.server_filter = False
+                return
+
+    def fetch_batch(self, offsets):
+        """在后台并行请求一轮索引页，返回按偏移量排列结果的任务 (失败的页以异常对象表示)"""
+        span = f"{offsets[0]}" if len(offsets) == 1 else f"{offsets[0]}~{offsets[-1]}"
+        logger.info(f"📡 正在扫描索引偏移量: {span}...")
+        flush_log()
+        return asyncio.ensure_future(
+            asyncio.gather(*[self.fetch_page(o) for o in offsets], return_exceptions=True)
+        )
+
+    async def iter_pages(self):
+        """按偏移量顺序产出索引页；每轮并行预取多页，批量逐轮翻倍直到遇到不满的一页
+
+        本轮结果确认未到末尾后立即发起下一轮请求，再把本轮产出给消费者；
+        生产者因队列已满而等待时，下一轮索引已在后台获取。
+        """
+        limit_per_page = self.config.page_size
+        offset, batch = 1, 1
+        offsets = [offset]
+        task = self.fetch_batch(offsets)
+        try:
+            while True:
+                # 临时性失败已在 ApiClient 中指数退避重试；到这里仍失败的页记入 failed.jsonl，不会被悄悄丢弃
+                pages = await task
+                failures = sum(isinstance(laws, Exception) for laws in pages)
+                at_end = any(not isinstance(laws, Exception) and len(laws) < limit_per_page for laws in pages)
+                next_offsets = None
+                if not at_end and failures < batch:
+                    offset += batch * limit_per_page
+                    # 出现失败时退回逐页请求，减轻服务器压力
+                    batch = 1 if failures else min(batch * 2, MAX_PAGE_BATCH)
+                    next_offsets = [offset + i * limit_per_page for i in range(batch)]
+                    task = self.fetch_batch(next_offsets)
+
+                for page_offset, laws in zip(offsets, pages):
+                    if isinstance(laws, Exception):
+                        logger.error(f"❌ 索引获取异常 (Offset {page_offset}): {laws}")
+                        self.record_page_failure(page_offset, laws)
                         continue
+                    if laws:
+                        yield laws
+                    if len(laws) < limit_per_page:
+                        if not laws:
+                            logger.info("🏁 已到达索引末尾。")
+                        return
+                if next_offsets is None:
+                    # 整轮全部失败说明索引接口不可用，停止扫描而不是无限跳页
+                    logger.error("❌ 索引接口持续不可用，停止扫描。")
+                    return
+                offsets = next_offsets
+        finally:
+            # 达到 limit 提前结束时取消尚未用到的预取
+            task.cancel()
 
-                    # 执行保存 (即时落盘)
-                    safe_name = re.sub(r"[^\w\-]", "_", law_name)
-                    file_path = output_dir / f"{law_id}_{safe_name[:50]}.json"
-                    file_path.write_text(json.dumps(detail_payload, ensure_ascii=False, indent=2))
-                    
-                    active_count += 1
-                    print(f"   ✅ [{active_count}] 已保存: {law_name}", flush=True)
-                    
-                    # 详情下载间隔，保护API
-                    time.sleep(0.3)
+    def record_failure(self, law, exc):
+        """把重试耗尽后仍失败的法令追加到 failed.jsonl"""
+        self.failed_count += 1
+        record = {"law_id": law.get("law_id"), "law_name": law.get("law_name"), "error": repr(exc)}
+        with self.failed_path.open("ab") as f:
+            f.write(dumps_json_line(record))
 
-                except Exception as e:
-                    # 详情下载失败只跳过当前条目，不中断全量任务
-                    continue
-
-            # 翻页逻辑
-            if len(laws) < limit_per_page:
-                break
-            offset += limit_per_page
-            
+    def record_page_failure(self, offset, exc):
+        """把重试耗尽后仍失败的索引页追加到 failed.jsonl"""
+        self.failed_pages += 1
+        record = {"offset": offset, "error": repr(exc)}
+        with self.failed_path.open("ab") as f:
+            f.write(dumps_json_line(record))
+
+    def report_progress(self):
+        elapsed = time.monotonic() - self.started_at
+        rate = self.processed_count / elapsed if elapsed > 0 else 0.0
+        logger.info(f"📊 已处理 {self.processed_count} 条索引 | 保存 {self.saved_count} | "
+                    f"失败 {self.failed_count} | {rate:.1f} 条/秒")
+        flush_log()
+
+    async def run_law(self, law):
+        """处理单条法令，完成即记录结果，不必等待同页其他法令"""
+        try:
+            await self.process_law(law)
         except Exception as e:
-            print(f"❌ 索引获取异常 (Offset {offset}): {e}")
-            # 如果索引获取失败，尝试跳过这页继续
-            offset += limit_per_page
-            time.sleep(2)
+            # 详情下载失败只跳过当前条目，不中断全量任务
+            self.record_failure(law, e)
+        finally:
+            self.processed_count += 1
+            if self.processed_count % PROGRESS_EVERY == 0:
+                self.report_progress()
+
+    async def worker(self, queue):
+        """消费者: 从队列取法令逐条处理，遇到结束标记 None 退出"""
+        while (law := await queue.get()) is not None:
+            await self.run_law(law)
+
+    async def run(self):
+        logger.info(f"🚀 启动流式下载任务。目标分类: {self.target_cat}")
+        self.failed_path.unlink(missing_ok=True)
+
+        # 生产者 (索引翻页) 与消费者 (详情下载) 通过队列流水线化，
+        # 下一页索引的获取与当前页详情的下载互相重叠
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        workers = [asyncio.create_task(self.worker(queue)) for _ in range(self.config.max_concurrent * 2)]
+        pages = self.iter_pages()
+        try:
+            async for laws in pages:
+                for law in laws:
+                    if self.limit_reached():
+                        break
+                    await queue.put(law)
+                if self.limit_reached():
+                    break
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+            await asyncio.gather(*self.pending_writes)
+
+            if self.limit_reached():
+                logger.info(f"🛑 已达到设定的下载上限 ({self.config.limit})，停止任务。")
+            else:
+                logger.info(f"\n🚀 任务完成! 共保存 {self.saved_count} 部有效国税法令。")
+        finally:
+            await pages.aclose()
+            for task in workers:
+                task.cancel()
+            if self.failed_count:
+                logger.warning(f"⚠️ {self.failed_count} 部法令下载失败，详见 {self.failed_path}")
+            if self.failed_pages:
+                logger.warning(f"⚠️ {self.failed_pages} 页索引获取失败，其中的法令未被处理，详见 {self.failed_path}")
+            # 正常结束时最后几行仍在缓冲中
+            flush_log()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="API 根地址")
+    parser.add_argument("--category-cd", default="013")
+    parser.add_argument("--limit", type=int, default=None, help="最多下载多少部法令后停止")
+    parser.add_argument("--max-concurrent", type=int, default=10, help="同时进行的请求数上限")
+    parser.add_argument("--rate-per-sec", type=float, default=5.0, help="全局每秒请求数上限")
+    parser.add_argument("--burst", type=int, default=10, help="限速器允许的最大突发请求数")
+    parser.add_argument("--no-cache", action="store_true", help="不使用索引/revision_info 的磁盘缓存")
+    parser.add_argument("--extraction-target", default="all",
+                        help="law_data 的 extraction_target，例如 main_provision,revision_info 以只下载正文")
+    parser.add_argument("--raw-output", action="store_true",
+                        help="原样保存 API 响应 (紧凑 JSON)，跳过全文的解析与缩进格式化")
+    parser.add_argument("--refresh", action="store_true", help="重新下载已存在的法令文件 (内容未变化时不改写)")
+    args = parser.parse_args(argv)
+    if parse_category(args.category_cd) is None:
+        parser.error(f"--category-cd 必须是数字: {args.category_cd}")
+    if args.limit is not None and args.limit < 1:
+        parser.error(f"--limit 必须是正整数: {args.limit}")
+    if args.max_concurrent < 1:
+        parser.error(f"--max-concurrent 必须是正整数: {args.max_concurrent}")
+    # not > 0 同时排除 nan
+    if not args.rate_per_sec > 0:
+        parser.error(f"--rate-per-sec 必须大于 0: {args.rate_per_sec}")
+    if args.burst < 1:
+        parser.error(f"--burst 必须是正整数: {args.burst}")
+    return args
 
-    print(f"\n🚀 任务完成! 共保存 {active_count} 部有效国税法令。")
+async def main():
+    args = parse_args()
+    setup_logging()
+    config = Config(
+        output_dir=Path(args.output_dir),
+        base_url=args.base_url,
+        category_cd=args.category_cd,
+        limit=args.limit,
+        max_concurrent=args.max_concurrent,
+        rate_per_sec=args.rate_per_sec,
+        burst=args.burst,
+        use_cache=not args.no_cache,
+        refresh=args.refresh,
+        extraction_target=args.extraction_target,
+        raw_output=args.raw_output,
+    )
+    downloader = Downloader(config)
+    try:
+        await downloader.run()
+    finally:
+        downloader.close()
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
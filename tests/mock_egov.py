@@ -0,0 +1,226 @@
+"""本地模拟 e-Gov 法令 API v2，供 download_laws.py 的行为测试使用
+
+数据规则 (第 i 部法令):
+- law_id 为 ID{i:04d}，law_num 为 NUM{i:04d}
+- i % 3 == 0 的分类为 013，其余为 005；i % 7 == 0 的为废止 (Repeal)
+- law_id 以 5 结尾的只能按 law_num 取得 (按 law_id 请求返回 404)
+- law_data 只返回 extraction_target 中请求的部分 (all 为全部)
+- /old/... 以 301 重定向到去掉 /old 的路径；/loop/... 始终重定向到自身
+"""
+import gzip
+import json
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+class MockEGov:
+    """在后台线程中运行的模拟服务器；stats 记录各类请求次数"""
+
+    def __init__(self, count=250, listing_fields=(), missing=(), failing_offsets=(),
+                 fail_status=500, delay=0.0, detail_revision_info=None, garbled=None,
+                 category_param="filter", certfile=None, keyfile=None, keep_alive=True):
+        # 索引条目额外携带的字段 (如 "category_cd")，默认只有 law_id/law_num/law_name
+        self.listing_fields = tuple(listing_fields)
+        # 全文按 law_id 与 law_num 均返回 404 的 law_id
+        self.missing = set(missing)
+        # 该偏移量的索引页始终返回 fail_status
+        self.failing_offsets = set(failing_offsets)
+        self.fail_status = fail_status
+        # offset -> 该索引页前几次返回的响应体为截断的 JSON (仍带 ETag)
+        self.garbled = dict(garbled or {})
+        # 索引接口对 category_cd 参数的处理: filter 按分类过滤，reject 返回 400，ignore 忽略参数
+        self.category_param = category_param
+        # 为 False 时每个响应都带 Connection: close，迫使客户端重新握手
+        self.keep_alive = keep_alive
+        self.delay = delay
+        # law_id -> 全文响应中的 revision_info (模拟与索引/探测结果不一致的全文)
+        self.detail_revision_info = dict(detail_revision_info or {})
+        self.laws = [
+            {
+                "law_id": f"ID{i:04d}",
+                "law_num": f"NUM{i:04d}",
+                "law_name": f"法律 第{i}号（テスト）",
+                "category_cd": "013" if i % 3 == 0 else "005",
+                "repeal_status": "Repeal" if i % 7 == 0 else None,
+                # 修改后全文内容与 ETag 随之变化
+                "version": 1,
+            }
+            for i in range(count)
+        ]
+        self.by_key = {law["law_id"]: law for law in self.laws}
+        self.by_key.update({law["law_num"]: law for law in self.laws})
+        self.stats = {
+            "laws": 0, "probe": 0, "detail": 0, "304": 0, "conns": 0, "inflight_max": 0,
+            # 重定向响应数；以完整 URL 作为请求行 (即经 HTTP 代理转发) 的请求数
+            "redirects": 0, "proxied": 0,
+            # 带 category_cd 参数的索引请求数；恢复了之前 TLS 会话的连接数
+            "filtered": 0, "tls_resumed": 0,
+        }
+        self._inflight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self.tls = certfile is not None
+        if self.tls:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        if self.tls:
+            # 证书签发给 localhost
+            return f"https://localhost:{self._server.server_port}/api/2"
+        return f"http://127.0.0.1:{self._server.server_port}/api/2"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def count(self, key, delta=1):
+        with self._lock:
+            self.stats[key] += delta
+
+    def expected_ids(self):
+        """按规则应被保存的 law_id (分类 013 且未废止，且全文可取得)"""
+        return {
+            law["law_id"] for law in self.laws
+            if law["category_cd"] == "013" and law["repeal_status"] is None and law["law_id"] not in self.missing
+        }
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                mock.count("conns")
+                if getattr(self.connection, "session_reused", False):
+                    mock.count("tls_resumed")
+
+            def log_message(self, *args):
+                pass
+
+            def send(self, code, obj=None, etag=None):
+                body = b"" if obj is None else json.dumps(obj, ensure_ascii=False).encode("utf-8")
+                self.send_raw(body, code, etag)
+
+            def send_raw(self, body, code=200, etag=None):
+                self.send_response(code)
+                if not mock.keep_alive:
+                    self.send_header("Connection", "close")
+                if etag:
+                    self.send_header("ETag", etag)
+                if body and "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with mock._lock:
+                    mock._inflight += 1
+                    mock.stats["inflight_max"] = max(mock.stats["inflight_max"], mock._inflight)
+                try:
+                    if mock.delay:
+                        time.sleep(mock.delay)
+                    self.route()
+                finally:
+                    with mock._lock:
+                        mock._inflight -= 1
+
+            def not_modified(self, etag):
+                if self.headers.get("If-None-Match") != etag:
+                    return False
+                mock.count("304")
+                self.send(304, etag=etag)
+                return True
+
+            def redirect(self, location):
+                mock.count("redirects")
+                self.send_response(301)
+                self.send_header("Location", location)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def route(self):
+                url = urlparse(self.path)
+                if url.scheme:
+                    mock.count("proxied")
+                if url.path.startswith("/old/"):
+                    target = url.path[len("/old"):]
+                    return self.redirect(f"{target}?{url.query}" if url.query else target)
+                if url.path.startswith("/loop/"):
+                    return self.redirect(url.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path == "/api/2/laws":
+                    mock.count("laws")
+                    offset = int(query.get("offset", 1))
+                    if offset in mock.failing_offsets:
+                        return self.send(mock.fail_status, {"message": "error"})
+                    limit = int(query.get("limit", 100))
+                    items = mock.laws
+                    if "category_cd" in query:
+                        mock.count("filtered")
+                        if mock.category_param == "reject":
+                            return self.send(400, {"message": "unknown parameter: category_cd"})
+                        if mock.category_param == "filter":
+                            items = [law for law in items if law["category_cd"] == query["category_cd"]]
+                    page = items[offset - 1:offset - 1 + limit]
+                    etag = f'"laws-{offset}-{limit}-{query.get("category_cd", "")}"'
+                    if self.not_modified(etag):
+                        return
+                    fields = ("law_id", "law_num", "law_name") + mock.listing_fields
+                    listing = [{field: law[field] for field in fields} for law in page]
+                    with mock._lock:
+                        garbled = mock.garbled.get(offset, 0) > 0
+                        if garbled:
+                            mock.garbled[offset] -= 1
+                    if garbled:
+                        return self.send_raw(b'{"laws_response": {"law_info_l', etag=etag)
+                    return self.send(200, {"laws_response": {"law_info_list": listing}}, etag=etag)
+                if url.path.startswith("/api/2/law_data/"):
+                    key = unquote(url.path.rsplit("/", 1)[1])
+                    parts = set(query.get("extraction_target", "all").split(","))
+                    probe = parts == {"revision_info"}
+                    mock.count("probe" if probe else "detail")
+                    law = mock.by_key.get(key)
+                    if law is None or (key == law["law_id"] and key.endswith("5")):
+                        return self.send(404, {"message": "not found"})
+                    if not probe and law["law_id"] in mock.missing:
+                        return self.send(404, {"message": "not found"})
+                    etag = f'"{"probe" if probe else "detail"}-{law["law_id"]}-{law["version"]}"'
+                    if self.not_modified(etag):
+                        return
+                    payload = {"law_data_response": {}}
+                    if "all" in parts or "revision_info" in parts:
+                        revision_info = {"category_cd": law["category_cd"], "repeal_status": law["repeal_status"]}
+                        if not probe:
+                            revision_info = mock.detail_revision_info.get(law["law_id"], revision_info)
+                        payload["law_data_response"]["revision_info"] = revision_info
+                    if not probe:
+                        payload["law_data_response"]["law_full_text"] = {
+                            "tag": "Law", "version": law["version"], "children": ["条文" * 200],
+                        }
+                    return self.send(200, payload, etag=etag)
+                self.send(404, {})
+
+        return Handler